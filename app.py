@@ -1,42 +1,191 @@
 import os
-import json
+import orjson
+import redis
+import atexit
+import hashlib
+import logging
+from logging.handlers import QueueHandler, QueueListener
 import sqlite3
 import re
 import random
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import lru_cache, partial
 from datetime import datetime
 from flask import Flask, request, jsonify, render_template
+from flask.json.provider import JSONProvider
 from flask_cors import CORS
+from requests import Session
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from twilio.rest import Client
+from twilio.http.http_client import TwilioHttpClient
 from twilio.base.exceptions import TwilioRestException
-from dotenv import load_dotenv
-import traceback
+from config import (
+    TWILIO_ACCOUNT_SID,
+    TWILIO_AUTH_TOKEN,
+    TWILIO_MESSAGING_SERVICE_SID,
+    TWILIO_PHONE_NUMBER,
+    RCS_CARD_TEMPLATE_SID,
+    TWILIO_STATUS_CALLBACK_URL,
+    TWILIO_POOL_SIZE,
+    APPOINTMENT_MESSAGE_TEMPLATE,
+    DATABASE,
+    SQLITE_PRAGMAS,
+    DB_POOL_SIZE,
+    DB_MAX_OVERFLOW,
+    DB_READ_POOL_SIZE,
+    DB_CACHED_STATEMENTS,
+    LOG_BATCH_SIZE,
+    LOG_BATCH_WAIT,
+    LOG_QUEUE_MAXSIZE,
+    STATUS_UPDATE_PARK_TTL,
+    STATUS_UPDATE_PARK_SIZE,
+    STATUS_UPDATE_RETRY_INTERVAL,
+    MESSAGES_CACHE_TTL,
+    MESSAGES_CACHE_SIZE,
+    ANALYTICS_CACHE_TTL,
+    REDIS_URL,
+    REDIS_SOCKET_TIMEOUT,
+    BULK_MAX_RECIPIENTS,
+    BULK_SEND_RATE,
+    BULK_MAX_WORKERS,
+    BULK_MIN_THROTTLE,
+    BULK_MAX_THROTTLED_SECONDS,
+    REPLY_MAX_WORKERS,
+    SEND_JOB_HISTORY,
+    SEND_JOB_RETENTION_HOURS,
+    MESSAGE_STATUS_CACHE_TTL,
+    MESSAGE_STATUS_CACHE_SIZE,
+    WEBHOOK_DEDUPE_WINDOW,
+    WEBHOOK_DEDUPE_SIZE,
+    LOG_LEVEL,
+)
 
-# Load environment variables
-load_dotenv()
+class OrjsonProvider(JSONProvider):
+    """Route request.get_json() and jsonify() through orjson"""
+    
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=str, option=orjson.OPT_NON_STR_KEYS).decode()
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+    
+    def response(self, *args, **kwargs):
+        # Hand the bytes straight to the response instead of round-tripping through str
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(
+            orjson.dumps(obj, default=str, option=orjson.OPT_NON_STR_KEYS),
+            mimetype='application/json'
+        )
 
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
 CORS(app)  # Enable CORS for iframe embedding
 
-# Twilio Configuration from Environment Variables
-TWILIO_ACCOUNT_SID = os.getenv('TWILIO_ACCOUNT_SID')
-TWILIO_AUTH_TOKEN = os.getenv('TWILIO_AUTH_TOKEN')
-TWILIO_MESSAGING_SERVICE_SID = os.getenv('TWILIO_MESSAGING_SERVICE_SID')
-TWILIO_PHONE_NUMBER = os.getenv('TWILIO_PHONE_NUMBER', '+18886103810')
+# ==========================================
+# LOGGING
+# ==========================================
+# Request threads only enqueue records; a listener thread formats and writes them
+_log_stream_handler = logging.StreamHandler()
+_log_stream_handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s: %(message)s'))
+
+_log_record_queue = queue.Queue(-1)
+_log_listener = QueueListener(_log_record_queue, _log_stream_handler)
+_log_listener.start()
+atexit.register(_log_listener.stop)
 
-# RCS Template Configuration from Environment Variable
-RCS_CARD_TEMPLATE_SID = os.getenv('RCS_CARD_TEMPLATE_SID', 'HXf872225ca0766f4b7f0f7ab024685ae7')
+logger = logging.getLogger('rcs')
+logger.setLevel(LOG_LEVEL)
+logger.addHandler(QueueHandler(_log_record_queue))
+logger.propagate = False
 
-# Initialize Twilio client
-twilio_client = Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
+# Initialize Twilio client on a keep-alive session so sends reuse TLS connections
+twilio_session = Session()
+twilio_session.headers['Connection'] = 'keep-alive'
+# urllib3's pool already discards sockets it can see the server closed. Retry only covers
+# connect-phase failures: a POST that fails after it was sent (e.g. RemoteDisconnected on a
+# socket closed mid-request) raises instead of being resent, so a create() is never sent twice
+twilio_session.mount('https://', HTTPAdapter(
+    pool_connections=1,
+    pool_maxsize=TWILIO_POOL_SIZE,
+    max_retries=Retry(total=2, backoff_factor=0.1)
+))
+twilio_http_client = TwilioHttpClient()
+twilio_http_client.session = twilio_session
+twilio_client = Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN, http_client=twilio_http_client)
+
+# ==========================================
+# CANNED REPLIES
+# ==========================================
+# Quick-reply button payloads (lowercased)
+BUTTON_REPLIES = {
+    'confirm': "✅ Perfect! Your appointment is confirmed. We'll send you a reminder 24 hours before.",
+    'confirmed': "✅ Perfect! Your appointment is confirmed. We'll send you a reminder 24 hours before.",
+    'reschedule': "📅 No problem! When would work better for you? Reply with your preferred date and time.",
+    'call': "📞 Please call us at 1-888-610-3810. We're available Mon-Fri 9AM-5PM EST.",
+    'call_us': "📞 Please call us at 1-888-610-3810. We're available Mon-Fri 9AM-5PM EST.",
+    'call us': "📞 Please call us at 1-888-610-3810. We're available Mon-Fri 9AM-5PM EST.",
+}
+WEBSITE_REPLY = "🌐 Visit us at ringlypro.com or let me know what specific information you're looking for!"
+
+# Numbered SMS replies to the appointment reminder
+NUMBERED_REPLIES = {
+    '1': "✅ Perfect! Your appointment is confirmed. We'll see you soon!",
+    '2': "📅 To reschedule, please call us at 1-888-610-3810 or reply with your preferred date and time.",
+    '3': "📞 Please call us at 1-888-610-3810. We're available Mon-Fri 9AM-5PM EST.",
+}
+
+GREETING_REPLY = "Thanks for reaching out to RinglyPro! How can I help you today?"
+
+# Menu sent when nothing in a message or button payload is recognized
+DEFAULT_REPLY = (
+    "Thanks for your message! I can help you with:\n\n"
+    "📱 Getting started with RinglyPro\n"
+    "💰 Pricing information\n"
+    "🎯 Features overview\n"
+    "📅 Scheduling a demo\n"
+    "🛟 Technical support\n\n"
+    "What interests you most?"
+)
+
+# Every intent and yes/no keyword contains a letter; payloads without one can only get DEFAULT_REPLY
+HAS_LETTER = re.compile(r'[^\W\d_]')
 
 # ==========================================
 # DATABASE SETUP - MUST BE FIRST!
 # ==========================================
-DATABASE = 'messages.db'
+def apply_pragmas(conn):
+    """Apply performance PRAGMAs to a connection"""
+    for pragma in SQLITE_PRAGMAS:
+        conn.execute(pragma)
+
+# Nullable columns that older or divergent schemas may lack, as (name, type).
+# Some deployments created messages with only template_used/variables or only
+# image_url/quick_replies; both are brought up to the full schema here.
+MESSAGE_COLUMN_MIGRATIONS = (
+    ('image_url', 'TEXT'),
+    ('quick_replies', 'TEXT'),
+    ('variables', 'TEXT'),
+    ('template_used', 'TEXT'),
+    ('customer_name', 'TEXT'),
+    ('appt_date', 'TEXT'),
+    ('appt_time', 'TEXT'),
+)
 
 def init_db():
     """Initialize SQLite database"""
     conn = sqlite3.connect(DATABASE)
+    apply_pragmas(conn)
+    # journal_mode persists in the file; anything but 'wal' means readers will block on writes
+    journal_mode = conn.execute('PRAGMA journal_mode').fetchone()[0]
+    if journal_mode.lower() != 'wal':
+        logger.warning("SQLite journal_mode is %s, not WAL; %s may be on a filesystem without shared memory", journal_mode, DATABASE)
     c = conn.cursor()
     c.execute('''
         CREATE TABLE IF NOT EXISTS messages (
@@ -50,15 +199,344 @@ def init_db():
             status TEXT,
             message_type TEXT,
             timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-            sid TEXT
+            sid TEXT,
+            customer_name TEXT,
+            appt_date TEXT,
+            appt_time TEXT
+        )
+    ''')
+    # Bring databases created before a column existed up to date
+    existing_columns = {row[1] for row in c.execute('PRAGMA table_info(messages)')}
+    for column, column_type in MESSAGE_COLUMN_MIGRATIONS:
+        if column not in existing_columns:
+            c.execute(f'ALTER TABLE messages ADD COLUMN {column} {column_type}')
+    # Covers narrow ?fields= listings so they never read the wide message/JSON columns;
+    # it also serves the plain newest-first scan that idx_messages_ts used to
+    c.execute('''
+        CREATE INDEX IF NOT EXISTS idx_messages_list
+        ON messages(timestamp DESC, id, recipient, status, message_type, sid)
+    ''')
+    c.execute('DROP INDEX IF EXISTS idx_messages_ts')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_messages_recipient_ts ON messages(recipient, timestamp DESC)')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_messages_sid ON messages(sid)')
+    # Async /send-rcs job states, so /task-status works on whichever worker gets the poll
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS send_jobs (
+            id TEXT PRIMARY KEY,
+            state TEXT NOT NULL,
+            result TEXT,
+            error TEXT,
+            updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
         )
     ''')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_send_jobs_updated ON send_jobs(updated_at)')
     conn.commit()
     conn.close()
 
 # Initialize main database
 init_db()
 
+# ==========================================
+# CONNECTION POOL
+# ==========================================
+def _create_connection(readonly=False):
+    """Open a reusable connection for a pool"""
+    if readonly:
+        # mode=ro never takes the write lock, so under WAL readers never wait on the writer
+        conn = sqlite3.connect(
+            f'file:{DATABASE}?mode=ro',
+            uri=True,
+            check_same_thread=False,
+            isolation_level=None,
+            cached_statements=DB_CACHED_STATEMENTS
+        )
+    else:
+        conn = sqlite3.connect(
+            DATABASE,
+            check_same_thread=False,
+            isolation_level=None,
+            cached_statements=DB_CACHED_STATEMENTS
+        )
+    conn.row_factory = sqlite3.Row
+    if readonly:
+        # journal_mode is a property of the database file, already set by init_db()
+        for pragma in SQLITE_PRAGMAS:
+            if 'journal_mode' not in pragma:
+                conn.execute(pragma)
+    else:
+        apply_pragmas(conn)
+    return conn
+
+class ConnectionPool:
+    """Fixed set of long-lived connections plus short-lived overflow ones"""
+    
+    def __init__(self, size, max_overflow, readonly=False):
+        self.readonly = readonly
+        self._pool = queue.Queue(maxsize=size)
+        for _ in range(size):
+            self._pool.put(_create_connection(readonly))
+        # Short-lived extra connections allowed when every pooled one is busy
+        self._overflow = threading.BoundedSemaphore(max_overflow)
+    
+    @contextmanager
+    def connection(self):
+        """Borrow a pooled connection (or a temporary overflow one) and hand it back when done"""
+        overflow = False
+        try:
+            conn = self._pool.get_nowait()
+        except queue.Empty:
+            if self._overflow.acquire(blocking=False):
+                conn = _create_connection(self.readonly)
+                overflow = True
+            else:
+                conn = self._pool.get()
+        try:
+            yield conn
+        finally:
+            # Never hand the next borrower a connection stuck in a half-finished transaction
+            if conn.in_transaction:
+                conn.rollback()
+            if overflow:
+                conn.close()
+                self._overflow.release()
+            else:
+                self._pool.put(conn)
+    
+    def close(self):
+        """Close pooled connections"""
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                break
+
+# Writes go through the read-write pool; /messages, /analytics and /conversations read from the read-only one
+_db_pool = ConnectionPool(DB_POOL_SIZE, DB_MAX_OVERFLOW)
+_db_read_pool = ConnectionPool(DB_READ_POOL_SIZE, DB_MAX_OVERFLOW, readonly=True)
+
+def get_conn():
+    """Borrow a read-write connection"""
+    return _db_pool.connection()
+
+def get_read_conn():
+    """Borrow a read-only connection"""
+    return _db_read_pool.connection()
+
+def _sqlite_has_json1():
+    """Whether this SQLite build ships the JSON1 functions"""
+    with get_read_conn() as conn:
+        try:
+            conn.execute("SELECT json_group_array(json_valid('[]'))").fetchone()
+        except sqlite3.OperationalError:
+            return False
+    return True
+
+# /messages falls back to building the JSON in Python on builds without JSON1
+MESSAGES_JSON_IN_SQL = _sqlite_has_json1()
+
+def _close_pool():
+    """Close pooled connections on process shutdown"""
+    _db_pool.close()
+    _db_read_pool.close()
+
+atexit.register(_close_pool)
+
+# ==========================================
+# BACKGROUND LOG WRITER
+# ==========================================
+INSERT_MESSAGE_SQL = '''
+    INSERT INTO messages (recipient, message, image_url, quick_replies, variables, template_used, status, message_type, sid,
+                          customer_name, appt_date, appt_time)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+# Delivery status reported by Twilio after the row was inserted
+UPDATE_MESSAGE_STATUS_SQL = '''
+    UPDATE messages SET status = ?, message_type = COALESCE(?, message_type)
+    WHERE sid = ?
+'''
+MessageStatusUpdate = namedtuple('MessageStatusUpdate', ('status', 'message_type', 'sid'))
+
+# Inbound conversation turns, written by the same background writer
+INSERT_CONVERSATION_SQL = '''
+    INSERT INTO conversations (phone_number, message, response, intent)
+    VALUES (?, ?, ?, ?)
+'''
+ConversationRow = namedtuple('ConversationRow', ('phone_number', 'message', 'response', 'intent'))
+
+# Async send job states; a final state is never overwritten by a late 'pending'
+UPSERT_SEND_JOB_SQL = '''
+    INSERT INTO send_jobs (id, state, result, error) VALUES (?, ?, ?, ?)
+    ON CONFLICT(id) DO UPDATE SET
+        state = excluded.state, result = excluded.result, error = excluded.error, updated_at = CURRENT_TIMESTAMP
+    WHERE send_jobs.state = 'pending'
+'''
+PRUNE_SEND_JOBS_SQL = "DELETE FROM send_jobs WHERE updated_at < datetime('now', ?)"
+SendJobState = namedtuple('SendJobState', ('id', 'state', 'result', 'error'))
+
+_log_queue = queue.Queue(maxsize=LOG_QUEUE_MAXSIZE)
+
+_LOG_STOP = object()  # sentinel queued at shutdown
+
+def _write_log_items(cursor, rows, updates, conversations, jobs=()):
+    """Commit message rows, status updates, conversations and job states in one transaction
+
+    Returns the status updates that matched no message row.
+    """
+    # Inserts go first so a status update can land on a row from the same batch
+    cursor.execute('BEGIN IMMEDIATE')
+    try:
+        cursor.executemany(INSERT_MESSAGE_SQL, rows)
+        unmatched = []
+        for update in updates:
+            cursor.execute(UPDATE_MESSAGE_STATUS_SQL, update)
+            if cursor.rowcount == 0:
+                unmatched.append(update)
+        cursor.executemany(INSERT_CONVERSATION_SQL, conversations)
+        if jobs:
+            cursor.executemany(UPSERT_SEND_JOB_SQL, jobs)
+            cursor.execute(PRUNE_SEND_JOBS_SQL, (f'-{SEND_JOB_RETENTION_HOURS} hours',))
+        cursor.execute('COMMIT')
+    except Exception:
+        if cursor.connection.in_transaction:
+            cursor.execute('ROLLBACK')
+        raise
+    return unmatched
+
+def _take_parked_updates(parked):
+    """Empty the parked status updates; return them (oldest first) with their deadlines by sid"""
+    entries = list(parked.values())
+    parked.clear()
+    return [update for _, update in entries], {update.sid: expires_at for expires_at, update in entries}
+
+def _park_updates(parked, updates, expiries):
+    """Hold unmatched status updates for the next try, dropping expired ones
+
+    expiries keeps the original deadline of updates that were already parked.
+    """
+    now = time.monotonic()
+    for update in updates:
+        earlier = parked.get(update.sid)
+        if earlier is not None and update.message_type is None:
+            # The latest status wins, but keep a channel an earlier callback reported
+            update = update._replace(message_type=earlier[1].message_type)
+        parked[update.sid] = (expiries.get(update.sid, now + STATUS_UPDATE_PARK_TTL), update)
+    for sid in [sid for sid, (expires_at, _) in parked.items() if expires_at < now]:
+        logger.warning("No message row for %s; dropping status update %s", sid, parked.pop(sid)[1].status)
+    while len(parked) > STATUS_UPDATE_PARK_SIZE:
+        sid, (_, update) = parked.popitem(last=False)
+        logger.warning("Too many parked status updates; dropping %s for %s", update.status, sid)
+
+def _split_log_items(rows, updates, conversations, jobs):
+    """Yield every item of a failed batch as a batch of its own"""
+    for row in rows:
+        yield [row], [], [], []
+    for update in updates:
+        yield [], [update], [], []
+    for conversation in conversations:
+        yield [], [], [conversation], []
+    for job in jobs:
+        yield [], [], [], [job]
+
+def _log_writer():
+    """Drain queued rows (messages, lists of messages, status updates, conversations, job states) and commit them in batches"""
+    conn = _create_connection()
+    cursor = conn.cursor()
+    # Status callbacks can beat their row (bulk rows are queued once the whole batch is sent,
+    # and the row may come from another gunicorn worker); parked ones are retried every batch
+    parked = OrderedDict()
+    stopping = False
+    while not stopping:
+        rows = []
+        updates = []
+        conversations = []
+        jobs = []
+        try:
+            # While updates are parked, wake up periodically to retry them even without new work
+            item = _log_queue.get(timeout=STATUS_UPDATE_RETRY_INTERVAL) if parked else _log_queue.get()
+        except queue.Empty:
+            item = None
+        deadline = time.monotonic() + LOG_BATCH_WAIT
+        while item is not None:
+            if item is _LOG_STOP:
+                stopping = True
+                break
+            if isinstance(item, list):
+                rows.extend(item)
+            elif isinstance(item, MessageStatusUpdate):
+                updates.append(item)
+            elif isinstance(item, ConversationRow):
+                conversations.append(item)
+            elif isinstance(item, SendJobState):
+                jobs.append(item)
+            else:
+                rows.append(item)
+            remaining = deadline - time.monotonic()
+            if len(rows) + len(updates) + len(conversations) + len(jobs) >= LOG_BATCH_SIZE or remaining <= 0:
+                break
+            try:
+                item = _log_queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+        if not rows and not updates and not conversations and not jobs and not parked:
+            continue
+        # Parked callbacks go first so newer ones in this batch win
+        retried, expiries = _take_parked_updates(parked)
+        updates = retried + updates
+        try:
+            # Take the write lock once per batch rather than once per row
+            unmatched = _write_log_items(cursor, rows, updates, conversations, jobs)
+        except Exception as e:
+            # One bad row (or a lock timeout) must not discard other requests' entries
+            logger.error("Error writing message log batch, retrying item by item: %s", e)
+            unmatched = []
+            for items in _split_log_items(rows, updates, conversations, jobs):
+                try:
+                    unmatched.extend(_write_log_items(cursor, *items))
+                except Exception as e:
+                    logger.error("Dropping message log item %r: %s", items, e)
+        _park_updates(parked, unmatched, expiries)
+        if rows or conversations or len(unmatched) < len(updates):
+            invalidate_messages_cache()
+    conn.close()
+
+def enqueue_message_rows(item):
+    """Hand a row, list of rows, status update, conversation or job state to the writer without blocking the request"""
+    try:
+        _log_queue.put_nowait(item)
+    except queue.Full:
+        # Writer is behind; write inline rather than drop the rows
+        rows = item if isinstance(item, list) else [item]
+        if isinstance(item, MessageStatusUpdate):
+            sql = UPDATE_MESSAGE_STATUS_SQL
+        elif isinstance(item, ConversationRow):
+            sql = INSERT_CONVERSATION_SQL
+        elif isinstance(item, SendJobState):
+            sql = UPSERT_SEND_JOB_SQL
+        else:
+            sql = INSERT_MESSAGE_SQL
+        logger.warning("Message log queue full; writing %d row(s) inline", len(rows))
+        with get_conn() as conn:
+            try:
+                conn.execute('BEGIN IMMEDIATE')
+                conn.executemany(sql, rows)
+                conn.execute('COMMIT')
+                invalidate_messages_cache()
+            except Exception as e:
+                if conn.in_transaction:
+                    conn.execute('ROLLBACK')
+                logger.error("Error writing message log rows: %s", e)
+
+_log_writer_thread = threading.Thread(target=_log_writer, name='log-writer', daemon=True)
+_log_writer_thread.start()
+
+def _flush_log_queue():
+    """Commit any queued rows before the process exits"""
+    _log_queue.put(_LOG_STOP)
+    _log_writer_thread.join(timeout=5)
+
+atexit.register(_flush_log_queue)
+
 # ==========================================
 # CONVERSATION TRACKING DATABASE
 # ==========================================
@@ -76,6 +554,11 @@ def init_conversation_db():
             timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
         )
     ''')
+    # /conversations lists newest first, optionally for one phone number
+    c.execute('CREATE INDEX IF NOT EXISTS idx_conversations_ts ON conversations(timestamp DESC)')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_conversations_phone_ts ON conversations(phone_number, timestamp DESC)')
+    # /analytics groups by intent
+    c.execute('CREATE INDEX IF NOT EXISTS idx_conversations_intent ON conversations(intent)')
     conn.commit()
     conn.close()
 
@@ -83,23 +566,16 @@ def init_conversation_db():
 init_conversation_db()
 
 def log_conversation(phone, message, response, intent=None):
-    """Log conversation for learning and analytics"""
-    try:
-        conn = sqlite3.connect(DATABASE)
-        c = conn.cursor()
-        c.execute('''
-            INSERT INTO conversations (phone_number, message, response, intent)
-            VALUES (?, ?, ?, ?)
-        ''', (phone, message, response, intent))
-        conn.commit()
-        conn.close()
-    except Exception as e:
-        print(f"Error logging conversation: {str(e)}")
+    """Queue a conversation turn for the background log writer"""
+    enqueue_message_rows(ConversationRow(phone, message, response, intent))
 
 # ==========================================
 # INTELLIGENT RESPONSE SYSTEM
 # ==========================================
 
+# Any of these makes an intent pattern a real regex rather than a plain keyword
+REGEX_METACHARS = re.compile(r'[\\.^$*+?{}\[\]|()]')
+
 class IntelligentResponder:
     """AI-powered response system for customer queries"""
     
@@ -165,45 +641,71 @@ class IntelligentResponder:
                 ]
             }
         }
+        
+        # Patterns never change after init. Plain keywords become substring checks;
+        # the rest of each intent's patterns compile into one alternation, so a message
+        # is scanned once per intent, in intent priority order. (A single regex across
+        # intents would pick the earliest match in the text instead of the
+        # highest-priority intent.)
+        self._compiled_intents = []
+        for intent, data in self.intents.items():
+            keywords = tuple(p for p in data['patterns'] if not REGEX_METACHARS.search(p))
+            regexes = [p for p in data['patterns'] if REGEX_METACHARS.search(p)]
+            pattern = re.compile('|'.join(f'(?:{p})' for p in regexes)) if regexes else None
+            self._compiled_intents.append((intent, keywords, pattern))
+        
+        # Most intents have a single reply; store it bare so answering skips random.choice
+        self._responses = {
+            intent: data['responses'][0] if len(data['responses']) == 1 else tuple(data['responses'])
+            for intent, data in self.intents.items()
+        }
+        
+        # Inbound bodies repeat a lot ("hi", "pricing", "demo"); remember their intent
+        self._classify = lru_cache(maxsize=2048)(self._scan_intents)
+        
+        # Yes/no fallbacks: one scan each instead of a Python loop over the words
+        self._affirm_re = re.compile('yes|yeah|sure|ok|okay|yep')
+        self._negate_re = re.compile('no|nope|not|nah')
     
     def detect_intent(self, message):
         """Detect the intent of the user's message"""
-        message_lower = message.lower()
-        
-        for intent, data in self.intents.items():
-            for pattern in data['patterns']:
-                if re.search(pattern, message_lower):
+        # Surrounding whitespace never affects a match, so variants share one cache entry
+        return self._classify(message.lower().strip())
+    
+    def _scan_intents(self, message_lower):
+        """Return the first intent whose patterns match, in priority order"""
+        for intent, keywords, pattern in self._compiled_intents:
+            for keyword in keywords:
+                if keyword in message_lower:
                     return intent
+            if pattern is not None and pattern.search(message_lower):
+                return intent
         return None
     
     def get_response(self, message, phone_number=None):
         """Get intelligent response based on message"""
+        return self.respond(message, phone_number)[1]
+    
+    def respond(self, message, phone_number=None):
+        """Return (intent, response) so callers can log the intent without detecting it again"""
         
         # Detect intent
         intent = self.detect_intent(message)
         
-        if intent and intent in self.intents:
-            responses = self.intents[intent]['responses']
-            return random.choice(responses)
+        if intent and intent in self._responses:
+            responses = self._responses[intent]
+            return intent, responses if isinstance(responses, str) else random.choice(responses)
         
         # Check for yes/no responses
         message_lower = message.lower()
-        if any(word in message_lower for word in ['yes', 'yeah', 'sure', 'ok', 'okay', 'yep']):
-            return "Great! 🎉 What would you like to do next? You can:\n\n1️⃣ Start free trial\n2️⃣ Schedule a demo\n3️⃣ Learn about features\n\nJust reply with your choice!"
+        if self._affirm_re.search(message_lower):
+            return None, "Great! 🎉 What would you like to do next? You can:\n\n1️⃣ Start free trial\n2️⃣ Schedule a demo\n3️⃣ Learn about features\n\nJust reply with your choice!"
         
-        if any(word in message_lower for word in ['no', 'nope', 'not', 'nah']):
-            return "No problem! If you change your mind or have any questions, I'm here 24/7. How else can I help you today?"
+        if self._negate_re.search(message_lower):
+            return None, "No problem! If you change your mind or have any questions, I'm here 24/7. How else can I help you today?"
         
         # Default response for unrecognized input
-        return (
-            "Thanks for your message! I can help you with:\n\n"
-            "📱 Getting started with RinglyPro\n"
-            "💰 Pricing information\n"
-            "🎯 Features overview\n"
-            "📅 Scheduling a demo\n"
-            "🛟 Technical support\n\n"
-            "What interests you most?"
-        )
+        return None, DEFAULT_REPLY
 
 # Initialize the AI responder
 ai_responder = IntelligentResponder()
@@ -212,195 +714,654 @@ ai_responder = IntelligentResponder()
 # HELPER FUNCTIONS
 # ==========================================
 
-def log_message(recipient, message, image_url=None, quick_replies=None, variables=None, status='sent', message_type='SMS', sid=None, template_used=None):
-    """Log message to database"""
+# E.164: optional +, no leading zero, 8-15 digits total (surrounding whitespace tolerated)
+E164_PATTERN = re.compile(r'^\s*\+?[1-9]\d{7,14}\s*$')
+
+def normalize_phone(phone):
+    """Strip whitespace and ensure a phone number carries its leading '+'"""
+    phone = phone.strip()
+    return phone if phone[:1] == '+' else f'+{phone}'
+
+def is_rcs_sender(from_field):
+    """Whether a Twilio From value is an RCS sender ('rcs:...'), lowercasing only the prefix"""
+    return from_field[:4].lower() == 'rcs:'
+
+# Template variables stored in their own columns instead of the JSON blob
+TEMPLATE_VARIABLE_KEYS = ('name', 'date', 'time')
+
+def build_message_row(recipient, message, image_url=None, quick_replies=None, variables=None, status='sent', message_type='SMS', sid=None, template_used=None):
+    """Build the INSERT parameters for one messages row"""
+    # Template variables get typed columns; only unexpected keys fall back to JSON
+    variables = variables or {}
+    typed_variables = [variables.get(k) for k in TEMPLATE_VARIABLE_KEYS]
+    if all(v is None or isinstance(v, str) for v in typed_variables):
+        extra_variables = {k: v for k, v in variables.items() if k not in TEMPLATE_VARIABLE_KEYS}
+    else:
+        # Lists or objects from request JSON don't fit the TEXT columns; keep the whole dict as JSON
+        extra_variables = variables
+        typed_variables = [None, None, None]
+    return (
+        recipient, 
+        message, 
+        image_url, 
+        orjson.dumps(quick_replies).decode() if quick_replies else None, 
+        orjson.dumps(extra_variables).decode() if extra_variables else None,
+        template_used,
+        status, 
+        message_type, 
+        sid,
+        *typed_variables
+    )
+
+def log_message(*args, **kwargs):
+    """Queue a message row for the background log writer"""
+    enqueue_message_rows(build_message_row(*args, **kwargs))
+
+def log_messages(rows):
+    """Queue prebuilt rows so the writer commits them in the same transaction"""
+    if rows:
+        enqueue_message_rows(list(rows))
+
+# messages columns stored as JSON text
+MESSAGE_JSON_COLUMNS = frozenset(('quick_replies', 'variables'))
+
+# Columns /messages may project via ?fields=
+MESSAGE_COLUMNS = (
+    'id', 'recipient', 'message', 'image_url', 'quick_replies', 'variables',
+    'template_used', 'status', 'message_type', 'timestamp', 'sid',
+    'customer_name', 'appt_date', 'appt_time'
+)
+TYPED_VARIABLE_COLUMNS = ('customer_name', 'appt_date', 'appt_time')
+
+# /messages queries; the same projection always yields the same string, so the
+# connection's statement cache reuses the prepared statement
+SELECT_MESSAGES_SQL = 'SELECT {} FROM messages ORDER BY timestamp DESC LIMIT ?'
+SELECT_RECIPIENT_MESSAGES_SQL = 'SELECT {} FROM messages WHERE recipient = ? ORDER BY timestamp DESC LIMIT ?'
+
+def _message_json_field(col):
+    """SQL expression rendering one column the way get_messages() does in Python"""
+    if col == 'variables':
+        # Newer rows keep template variables in typed columns; expose them the same way
+        return ("CASE WHEN variables IS NULL AND COALESCE(customer_name, appt_date, appt_time) IS NOT NULL "
+                "THEN json_object('name', customer_name, 'date', appt_date, 'time', appt_time) "
+                "WHEN json_valid(variables) THEN json(variables) ELSE variables END")
+    if col in MESSAGE_JSON_COLUMNS:
+        return f"CASE WHEN json_valid({col}) THEN json({col}) ELSE {col} END"
+    return col
+
+# Default /messages body built entirely by SQLite's JSON1 functions: one string, no per-row dicts
+_MESSAGES_JSON_OBJECT = 'json_object({})'.format(
+    ', '.join(f"'{col}', {_message_json_field(col)}" for col in MESSAGE_COLUMNS)
+)
+SELECT_MESSAGES_JSON_SQL = (
+    f"SELECT json_group_array({_MESSAGES_JSON_OBJECT}) FROM ("
+    + SELECT_MESSAGES_SQL.format('*') + ')'
+)
+SELECT_RECIPIENT_MESSAGES_JSON_SQL = (
+    f"SELECT json_group_array({_MESSAGES_JSON_OBJECT}) FROM ("
+    + SELECT_RECIPIENT_MESSAGES_SQL.format('*') + ')'
+)
+
+def _load_json_column(value):
+    """Decode a stored JSON column, leaving malformed values as-is"""
     try:
-        conn = sqlite3.connect(DATABASE)
-        c = conn.cursor()
-        c.execute('''
-            INSERT INTO messages (recipient, message, image_url, quick_replies, variables, template_used, status, message_type, sid)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
-            recipient, 
-            message, 
-            image_url, 
-            json.dumps(quick_replies) if quick_replies else None, 
-            json.dumps(variables) if variables else None,
-            template_used,
-            status, 
-            message_type, 
-            sid
+        return orjson.loads(value)
+    except orjson.JSONDecodeError:
+        return value
+
+# Extra messages.create() arguments; empty unless a status callback URL is configured
+STATUS_CALLBACK_ARGS = {'status_callback': TWILIO_STATUS_CALLBACK_URL} if TWILIO_STATUS_CALLBACK_URL else {}
+
+def build_content_variables(complete_message):
+    """Serialize the RCS template variables (single variable containing entire message)"""
+    # Same bytes as dumping {"1": complete_message}, without encoding a dict around the one value
+    return '{"1":' + orjson.dumps(complete_message).decode() + '}'
+
+# messages.create() arguments shared by every RCS Card template send
+RCS_TEMPLATE_ARGS = {
+    'messaging_service_sid': TWILIO_MESSAGING_SERVICE_SID,
+    'content_sid': RCS_CARD_TEMPLATE_SID,
+}
+
+def send_rcs_template(recipient_phone, complete_message, status_callback=True):
+    """Send complete_message through the RCS Card template
+
+    status_callback should be False for sends that never get a messages row,
+    so their callbacks don't wait for a row that will not come.
+    """
+    return twilio_client.messages.create(
+        to=recipient_phone,
+        content_variables=build_content_variables(complete_message),
+        **RCS_TEMPLATE_ARGS,
+        **(STATUS_CALLBACK_ARGS if status_callback else {})
+    )
+
+def _record_message(log_rows, row):
+    """Append row to the caller's batch, or queue it on its own"""
+    if log_rows is not None:
+        log_rows.append(row)
+    else:
+        enqueue_message_rows(row)
+
+def deliver_rcs(recipient_phone, complete_message, image_url=None, quick_replies=None, variables=None, log_rows=None):
+    """Send via the RCS Card template, falling back to SMS/MMS, and log the result
+
+    When log_rows is given the message row is appended to it instead of queued,
+    so the caller can commit a whole batch together.
+    """
+    try:
+        # Try sending with RCS Card template
+        logger.debug("Attempting RCS with template: %s", RCS_CARD_TEMPLATE_SID)
+        
+        message = send_rcs_template(recipient_phone, complete_message)
+        
+        logger.info("Message sent successfully: %s", message.sid)
+        
+        # The create response already carries the sender; no follow-up fetch needed.
+        # /twilio-status corrects the stored channel once Twilio reports it.
+        from_field = str(message.from_)
+        is_rcs = is_rcs_sender(from_field)
+        
+        logger.debug("Sent from: %s", from_field)
+        logger.debug("Is RCS: %s", is_rcs)
+        
+        # Log the message
+        _record_message(log_rows, build_message_row(
+            recipient_phone,
+            complete_message,
+            image_url,
+            quick_replies,
+            variables,
+            message.status,
+            'RCS' if is_rcs else 'SMS',
+            message.sid,
+            RCS_CARD_TEMPLATE_SID
         ))
-        conn.commit()
-        conn.close()
-    except Exception as e:
-        print(f"Error logging message: {str(e)}")
+        
+        return {
+            'success': True,
+            'message_sid': message.sid,
+            'sid': message.sid,
+            'status': message.status,
+            'message_type': 'RCS' if is_rcs else 'SMS',
+            'from': from_field,
+            'template_used': 'rcs_card'
+        }
+        
+    except TwilioRestException as e:
+        error_code = e.code if hasattr(e, 'code') else None
+        error_msg = str(e)
+        
+        logger.warning("Template failed (Code %s): %s", error_code, error_msg)
+        logger.info("Falling back to regular SMS...")
+        
+        # Fallback to SMS
+        message_params = {
+            'messaging_service_sid': TWILIO_MESSAGING_SERVICE_SID,
+            'to': recipient_phone,
+            'body': complete_message,
+            **STATUS_CALLBACK_ARGS
+        }
+        
+        # Add image if provided (MMS)
+        if image_url:
+            message_params['media_url'] = [image_url]
+        
+        message = twilio_client.messages.create(**message_params)
+        
+        logger.info("SMS sent successfully: %s", message.sid)
+        
+        # Log the SMS
+        _record_message(log_rows, build_message_row(
+            recipient_phone,
+            complete_message,
+            image_url,
+            quick_replies,
+            variables,
+            message.status,
+            'SMS' if not image_url else 'MMS',
+            message.sid,
+            None
+        ))
+        
+        return {
+            'success': True,
+            'message_sid': message.sid,
+            'sid': message.sid,
+            'status': message.status,
+            'message_type': 'SMS' if not image_url else 'MMS',
+            'from': str(message.from_),
+            'note': f'Sent as SMS/MMS (Template error: {error_code})'
+        }
+
+def build_appointment_message(customer_name, appointment_date, appointment_time):
+    """Build the default appointment reminder text"""
+    return APPOINTMENT_MESSAGE_TEMPLATE.format(name=customer_name, date=appointment_date, time=appointment_time)
+
+class TokenBucket:
+    """Thread-safe token bucket that paces outbound sends"""
+    
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or max(rate, 1)  # sub-1/s rates still need room for one token
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+    
+    def acquire(self):
+        """Block until a token is available, then take it"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+send_executor = ThreadPoolExecutor(max_workers=BULK_MAX_WORKERS, thread_name_prefix='twilio-send')
+# Bulk workers sleep on the rate limiters; inbound replies must not wait behind them
+reply_executor = ThreadPoolExecutor(max_workers=REPLY_MAX_WORKERS, thread_name_prefix='twilio-reply')
+bulk_rate_limiter = TokenBucket(BULK_SEND_RATE)
+
+# Async send jobs started by this worker, by id, oldest first; trimmed to SEND_JOB_HISTORY entries.
+# Their states also go to the send_jobs table so every worker can answer /task-status.
+_send_jobs = OrderedDict()
+_send_jobs_lock = threading.Lock()
+
+SELECT_SEND_JOB_SQL = 'SELECT state, result, error FROM send_jobs WHERE id = ?'
+
+def _record_send_job(job_id, future):
+    """Queue a finished job's outcome for the send_jobs table"""
+    error = future.exception()
+    if error:
+        enqueue_message_rows(SendJobState(job_id, 'failed', None, str(error)))
+    else:
+        enqueue_message_rows(SendJobState(job_id, 'done', orjson.dumps(future.result(), default=str).decode(), None))
+
+def submit_send_job(fn, *args):
+    """Run fn on the send executor and register it for /task-status"""
+    job_id = uuid.uuid4().hex
+    # Queued before the done-callback is attached, so the final state always follows it
+    enqueue_message_rows(SendJobState(job_id, 'pending', None, None))
+    future = send_executor.submit(fn, *args)
+    with _send_jobs_lock:
+        _send_jobs[job_id] = future
+        while len(_send_jobs) > SEND_JOB_HISTORY:
+            _send_jobs.popitem(last=False)
+    future.add_done_callback(partial(_record_send_job, job_id))
+    return job_id, future
+
+def get_send_job(job_id):
+    """Return the future for a job started by this worker, or None"""
+    with _send_jobs_lock:
+        return _send_jobs.get(job_id)
+
+def load_send_job(job_id):
+    """Return (state, result, error) for a job recorded by any worker, or None"""
+    with get_read_conn() as conn:
+        row = conn.execute(SELECT_SEND_JOB_SQL, (job_id,)).fetchone()
+    return tuple(row) if row is not None else None
+
+# ==========================================
+# MESSAGE HISTORY CACHE
+# ==========================================
+# /messages response bodies keyed by query; cleared after every committed write.
+# Other workers' writes are only picked up once MESSAGES_CACHE_TTL expires.
+_messages_cache = {}
+_messages_cache_lock = threading.Lock()
+
+# Bumped on every invalidation; a body read from the table before a write is never cached after it
+_messages_generation = 0
+
+# Shared second level across gunicorn workers. Keys embed a generation counter that every
+# committed write INCRs, so bodies from before the write are never served again.
+redis_client = redis.Redis.from_url(
+    REDIS_URL,
+    socket_timeout=REDIS_SOCKET_TIMEOUT,
+    socket_connect_timeout=REDIS_SOCKET_TIMEOUT
+) if REDIS_URL else None
+MESSAGES_REDIS_TTL_MS = int(MESSAGES_CACHE_TTL * 1000)
+MESSAGES_REDIS_GENERATION_KEY = b'rcs:messages:generation'
+
+def _messages_redis_key(key, generation):
+    """Redis key for a /messages cache key in the given generation"""
+    return b'rcs:messages:' + generation + b':' + orjson.dumps(key)
+
+def _get_local_messages(key):
+    """Return a body from this worker's cache, or None"""
+    with _messages_cache_lock:
+        entry = _messages_cache.get(key)
+    if entry is None or entry[0] < time.monotonic():
+        return None
+    return entry[1]
+
+def _cache_local_messages(key, body, generation):
+    """Remember a body in this worker's cache unless the table changed since it was read"""
+    with _messages_cache_lock:
+        if generation != _messages_generation:
+            return
+        if len(_messages_cache) >= MESSAGES_CACHE_SIZE:
+            _messages_cache.clear()
+        _messages_cache[key] = (time.monotonic() + MESSAGES_CACHE_TTL, body)
+
+def get_cached_messages(key):
+    """Return (body, token): a cached /messages body or None, and the token to hand to cache_messages"""
+    local_generation = _messages_generation
+    body = _get_local_messages(key)
+    if body is not None or redis_client is None:
+        return body, (local_generation, None)
+    
+    try:
+        generation = redis_client.get(MESSAGES_REDIS_GENERATION_KEY) or b'0'
+        redis_key = _messages_redis_key(key, generation)
+        body = redis_client.get(redis_key)
+        if body is None and not redis_client.set(redis_key + b':lock', 1, nx=True, ex=5):
+            # Another worker is building this body; give it a moment instead of stampeding SQLite
+            for _ in range(5):
+                time.sleep(0.02)
+                body = redis_client.get(redis_key)
+                if body is not None:
+                    break
+    except redis.RedisError as e:
+        logger.warning("Redis unavailable for /messages cache: %s", e)
+        return None, (local_generation, None)
+    
+    if body is not None:
+        _cache_local_messages(key, body, local_generation)
+    return body, (local_generation, generation)
+
+def cache_messages(key, body, token):
+    """Remember a /messages body for MESSAGES_CACHE_TTL seconds in the generation it was read in"""
+    local_generation, generation = token
+    _cache_local_messages(key, body, local_generation)
+    if redis_client is None or generation is None:
+        return
+    redis_key = _messages_redis_key(key, generation)
+    try:
+        pipe = redis_client.pipeline()
+        pipe.set(redis_key, body, px=MESSAGES_REDIS_TTL_MS)
+        pipe.delete(redis_key + b':lock')
+        pipe.execute()
+    except redis.RedisError as e:
+        logger.warning("Redis unavailable for /messages cache: %s", e)
+
+def invalidate_messages_cache():
+    """Drop cached /messages bodies after the table changed"""
+    global _messages_generation
+    with _messages_cache_lock:
+        _messages_generation += 1
+        _messages_cache.clear()
+    if redis_client is not None:
+        try:
+            redis_client.incr(MESSAGES_REDIS_GENERATION_KEY)
+        except redis.RedisError as e:
+            logger.warning("Redis unavailable; cached /messages bodies may be served until they expire: %s", e)
 
 # ==========================================
 # FLASK ROUTES
 # ==========================================
 
+# rcs.html is static, so render it once instead of on every GET
+with app.app_context():
+    INDEX_HTML = render_template('rcs.html')
+INDEX_ETAG = hashlib.sha1(INDEX_HTML.encode()).hexdigest()
+
 @app.route('/')
 def index():
     """Serve the main RCS client interface"""
-    return render_template('rcs.html')
+    response = app.response_class(INDEX_HTML, mimetype='text/html')
+    response.set_etag(INDEX_ETAG)
+    response.headers['Cache-Control'] = 'public, max-age=300'
+    # Answers If-None-Match with a 304 when the client already has this page
+    return response.make_conditional(request)
+
+# Configuration is read once at import, so the health payload's config block never changes
+HEALTH_CONFIG = {
+    'twilio_configured': bool(TWILIO_ACCOUNT_SID),
+    'messaging_service': bool(TWILIO_MESSAGING_SERVICE_SID),
+    'template_configured': bool(RCS_CARD_TEMPLATE_SID),
+    'template_sid': RCS_CARD_TEMPLATE_SID[:10] + '...' if RCS_CARD_TEMPLATE_SID else None,
+    'phone_number': TWILIO_PHONE_NUMBER,
+    'ai_enabled': True
+}
+
+# Everything but the timestamp is fixed, so serialize it once and splice the time in per request
+HEALTH_BODY_PREFIX = orjson.dumps({
+    'status': 'healthy', 
+    'service': 'RinglyPro RCS Assistant with AI',
+    'config': HEALTH_CONFIG
+})[:-1] + b',"timestamp":"'
+HEALTH_BODY_SUFFIX = b'"}'
+
+# (second, body): the body is rebuilt at most once per second
+_health_body = (-1, b'')
 
 @app.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint for monitoring"""
-    return jsonify({
-        'status': 'healthy', 
-        'service': 'RinglyPro RCS Assistant with AI',
-        'timestamp': datetime.now().isoformat(),
-        'config': {
-            'twilio_configured': bool(TWILIO_ACCOUNT_SID),
-            'messaging_service': bool(TWILIO_MESSAGING_SERVICE_SID),
-            'template_configured': bool(RCS_CARD_TEMPLATE_SID),
-            'template_sid': RCS_CARD_TEMPLATE_SID[:10] + '...' if RCS_CARD_TEMPLATE_SID else None,
-            'phone_number': TWILIO_PHONE_NUMBER,
-            'ai_enabled': True
-        }
-    }), 200
+    global _health_body
+    second = int(time.monotonic())
+    cached_second, body = _health_body
+    if cached_second != second:
+        body = HEALTH_BODY_PREFIX + datetime.now().isoformat().encode() + HEALTH_BODY_SUFFIX
+        _health_body = (second, body)
+    return app.response_class(body, status=200, mimetype='application/json')
 
 @app.route('/send-rcs', methods=['POST'])
 def send_rcs():
     """Send RCS message using Card template with SMS fallback"""
     try:
-        data = request.json
-        print(f"=== SEND RCS REQUEST ===")
-        print(f"Request data: {data}")
-        print(f"Using template: {RCS_CARD_TEMPLATE_SID}")
+        data = request.get_json(silent=True) or {}
+        logger.debug("=== SEND RCS REQUEST ===")
+        logger.debug("Request data: %s", data)
+        logger.debug("Using template: %s", RCS_CARD_TEMPLATE_SID)
+        
+        # A phones list fans the same message out concurrently via the bulk sender
+        if isinstance(data.get('phones'), list):
+            return send_rcs_bulk()
         
         recipient_phone = data.get('phone')
         
         if not recipient_phone:
             return jsonify({'success': False, 'error': 'Phone number is required'}), 400
+        
+        # Reject malformed numbers before paying for a Twilio round-trip
+        if not isinstance(recipient_phone, str) or not E164_PATTERN.match(recipient_phone):
+            return jsonify({'success': False, 'error': 'Invalid phone number'}), 400
+        
+        # Check if messaging service is configured before doing any message work
+        if not TWILIO_MESSAGING_SERVICE_SID:
+            logger.error("No messaging service configured")
+            return jsonify({
+                'success': False,
+                'error': 'Messaging service not configured. Please check environment variables.'
+            }), 500
             
-        if not recipient_phone.startswith('+'):
-            recipient_phone = '+' + recipient_phone
+        recipient_phone = normalize_phone(recipient_phone)
         
         # Get message variables
         customer_name = data.get('customer_name', 'Customer')
         appointment_date = data.get('date', 'tomorrow')
         appointment_time = data.get('time', '2:00 PM')
-        custom_message = data.get('message')
         image_url = data.get('image_url')
-        quick_replies = data.get('quick_replies', [])
+        quick_replies = data.get('quick_replies') or None
+        
+        # Build the complete message; the default text is only built when no custom message is given
+        complete_message = data.get('message') or build_appointment_message(customer_name, appointment_date, appointment_time)
+        
+        logger.debug("Sending to: %s", recipient_phone)
+        logger.debug("Message: %.100s...", complete_message)
         
-        # Build the complete message
-        if custom_message:
-            complete_message = custom_message
+        send_args = (
+            recipient_phone,
+            complete_message,
+            image_url,
+            quick_replies,
+            {'name': customer_name, 'date': appointment_date, 'time': appointment_time}
+        )
+        
+        # Fire-and-forget: hand the send + SMS fallback to a worker and answer right away
+        if data.get('async') or request.args.get('async') == '1':
+            job_id, future = submit_send_job(deliver_rcs, *send_args)
+            future.add_done_callback(lambda f: _log_background_send(job_id, recipient_phone, f))
+            return jsonify({'success': True, 'accepted': True, 'id': job_id, 'task_id': job_id}), 202
+        
+        result = deliver_rcs(*send_args)
+        return jsonify(result), 200
+            
+    except Exception as e:
+        logger.exception("ERROR in send_rcs: %s", e)
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+def _log_background_send(job_id, recipient_phone, future):
+    """Report the outcome of an async /send-rcs job"""
+    error = future.exception()
+    if error:
+        logger.error("Async send %s to %s failed: %s", job_id, recipient_phone, error)
+    else:
+        logger.info("Async send %s to %s finished: %s", job_id, recipient_phone, future.result().get('message_sid'))
+
+@app.route('/task-status/<job_id>', methods=['GET'])
+def task_status(job_id):
+    """Report the state of an async /send-rcs job"""
+    future = get_send_job(job_id)
+    if future is None:
+        # Started by another worker (or trimmed from this one): use the shared table
+        job = load_send_job(job_id)
+        if job is None:
+            return jsonify({'success': False, 'error': 'Unknown task id'}), 404
+        state, result, error = job
+        if state == 'failed':
+            return jsonify({'task_id': job_id, 'state': 'failed', 'error': error}), 200
+        if state == 'done':
+            return jsonify({'task_id': job_id, 'state': 'done', 'result': orjson.loads(result)}), 200
+        return jsonify({'task_id': job_id, 'state': state}), 200
+    
+    if not future.done():
+        state = 'running' if future.running() else 'pending'
+        return jsonify({'task_id': job_id, 'state': state}), 200
+    
+    error = future.exception()
+    if error:
+        return jsonify({'task_id': job_id, 'state': 'failed', 'error': str(error)}), 200
+    return jsonify({'task_id': job_id, 'state': 'done', 'result': future.result()}), 200
+
+def _send_bulk_item(item, log_rows):
+    """Send one entry of a bulk request; never raises"""
+    recipient_phone = item.get('phone') if isinstance(item, dict) else None
+    try:
+        if not recipient_phone:
+            return {'success': False, 'phone': recipient_phone, 'error': 'Phone number is required'}
+        
+        if not isinstance(recipient_phone, str) or not E164_PATTERN.match(recipient_phone):
+            return {'success': False, 'phone': recipient_phone, 'error': 'Invalid phone number'}
+        
+        recipient_phone = normalize_phone(recipient_phone)
+        
+        customer_name = item.get('customer_name') or item.get('name') or 'Customer'
+        appointment_date = item.get('date', 'tomorrow')
+        appointment_time = item.get('time', '2:00 PM')
+        complete_message = item.get('message') or build_appointment_message(customer_name, appointment_date, appointment_time)
+        
+        bulk_rate_limiter.acquire()
+        result = deliver_rcs(
+            recipient_phone,
+            complete_message,
+            item.get('image_url'),
+            item.get('quick_replies'),
+            {'name': customer_name, 'date': appointment_date, 'time': appointment_time},
+            log_rows
+        )
+    except Exception as e:
+        logger.error("Bulk send to %s failed: %s", recipient_phone, e)
+        result = {'success': False, 'error': str(e)}
+    
+    result['phone'] = recipient_phone
+    return result
+
+@app.route('/send-rcs-bulk', methods=['POST'])
+@app.route('/send-rcs-batch', methods=['POST'])
+def send_rcs_bulk():
+    """Send RCS messages to many recipients in one request"""
+    try:
+        data = request.get_json(silent=True)
+        throttle_per_sec = None
+        if isinstance(data, dict):
+            recipients = data.get('recipients') or data.get('sends')
+            throttle_per_sec = data.get('throttle_per_sec')
+            phones = data.get('phones')
+            if recipients is None and isinstance(phones, list):
+                # One message body shared by every phone in the list
+                shared = {k: v for k, v in data.items() if k not in ('phones', 'throttle_per_sec')}
+                recipients = [{**shared, 'phone': phone} for phone in phones]
         else:
-            complete_message = f"Hi {customer_name}! Your appointment is scheduled for {appointment_date} at {appointment_time}. Please confirm your attendance. Reply 1 to Confirm, 2 to Reschedule, or 3 to Call us."
+            recipients = data
+        
+        if not isinstance(recipients, list) or not recipients:
+            return jsonify({'success': False, 'error': 'A non-empty list of recipients is required'}), 400
         
-        print(f"Sending to: {recipient_phone}")
-        print(f"Message: {complete_message[:100]}...")
+        if len(recipients) > BULK_MAX_RECIPIENTS:
+            return jsonify({
+                'success': False,
+                'error': f'At most {BULK_MAX_RECIPIENTS} recipients per request'
+            }), 400
+        
+        # Optional per-request pace, on top of the process-wide BULK_SEND_RATE
+        throttle = None
+        if throttle_per_sec is not None:
+            if isinstance(throttle_per_sec, bool) or not isinstance(throttle_per_sec, (int, float)) or throttle_per_sec < BULK_MIN_THROTTLE:
+                return jsonify({
+                    'success': False,
+                    'error': f'throttle_per_sec must be a number of at least {BULK_MIN_THROTTLE}'
+                }), 400
+            # The request stays open for the whole paced run; keep it bounded
+            if len(recipients) / throttle_per_sec > BULK_MAX_THROTTLED_SECONDS:
+                return jsonify({
+                    'success': False,
+                    'error': f'throttle_per_sec too low: {len(recipients)} recipients must finish within {BULK_MAX_THROTTLED_SECONDS} seconds'
+                }), 400
+            throttle = TokenBucket(throttle_per_sec)
         
-        # Check if messaging service is configured
         if not TWILIO_MESSAGING_SERVICE_SID:
-            print("ERROR: No messaging service configured")
             return jsonify({
                 'success': False,
                 'error': 'Messaging service not configured. Please check environment variables.'
             }), 500
         
+        logger.info("=== BULK SEND: %d recipients ===", len(recipients))
+        log_rows = []
         try:
-            # Try sending with RCS Card template
-            print(f"Attempting RCS with template: {RCS_CARD_TEMPLATE_SID}")
-            
-            message = twilio_client.messages.create(
-                messaging_service_sid=TWILIO_MESSAGING_SERVICE_SID,
-                to=recipient_phone,
-                content_sid=RCS_CARD_TEMPLATE_SID,
-                content_variables=json.dumps({
-                    "1": complete_message  # Single variable containing entire message
-                })
-            )
-            
-            print(f"Message sent successfully: {message.sid}")
-            
-            # Check if it actually sent as RCS
-            sent_msg = twilio_client.messages(message.sid).fetch()
-            from_field = str(sent_msg.from_)
-            is_rcs = 'rcs:' in from_field.lower()
-            
-            print(f"Sent from: {from_field}")
-            print(f"Is RCS: {is_rcs}")
-            
-            # Log the message
-            log_message(
-                recipient_phone,
-                complete_message,
-                image_url,
-                quick_replies if quick_replies else None,
-                {'name': customer_name, 'date': appointment_date, 'time': appointment_time},
-                sent_msg.status,
-                'RCS' if is_rcs else 'SMS',
-                message.sid,
-                RCS_CARD_TEMPLATE_SID
-            )
-            
-            return jsonify({
-                'success': True,
-                'message_sid': message.sid,
-                'sid': message.sid,
-                'status': sent_msg.status,
-                'message_type': 'RCS' if is_rcs else 'SMS',
-                'from': from_field,
-                'template_used': 'rcs_card'
-            }), 200
-            
-        except TwilioRestException as e:
-            error_code = e.code if hasattr(e, 'code') else None
-            error_msg = str(e)
-            
-            print(f"Template failed (Code {error_code}): {error_msg}")
-            print("Falling back to regular SMS...")
-            
-            # Fallback to SMS
-            message_params = {
-                'messaging_service_sid': TWILIO_MESSAGING_SERVICE_SID,
-                'to': recipient_phone,
-                'body': complete_message
-            }
-            
-            # Add image if provided (MMS)
-            if image_url:
-                message_params['media_url'] = [image_url]
-            
-            message = twilio_client.messages.create(**message_params)
-            
-            print(f"SMS sent successfully: {message.sid}")
-            
-            # Check actual status
-            sent_msg = twilio_client.messages(message.sid).fetch()
-            
-            # Log the SMS
-            log_message(
-                recipient_phone,
-                complete_message,
-                image_url,
-                quick_replies if quick_replies else None,
-                {'name': customer_name, 'date': appointment_date, 'time': appointment_time},
-                sent_msg.status,
-                'SMS' if not image_url else 'MMS',
-                message.sid,
-                None
-            )
-            
-            return jsonify({
-                'success': True,
-                'message_sid': message.sid,
-                'sid': message.sid,
-                'status': sent_msg.status,
-                'message_type': 'SMS' if not image_url else 'MMS',
-                'from': str(sent_msg.from_),
-                'note': f'Sent as SMS/MMS (Template error: {error_code})'
-            }), 200
-            
+            send_item = partial(_send_bulk_item, log_rows=log_rows)
+            if throttle is None:
+                results = list(send_executor.map(send_item, recipients))
+            else:
+                # Pace submissions here so throttled runs never sleep on shared send workers
+                futures = []
+                for item in recipients:
+                    throttle.acquire()
+                    futures.append(send_executor.submit(send_item, item))
+                results = [future.result() for future in futures]
+        finally:
+            # Whatever already went out to Twilio gets logged, even if the batch is cut short
+            log_messages(log_rows)
+        sent = sum(1 for r in results if r.get('success'))
+        
+        return jsonify({
+            'success': sent == len(results),
+            'total': len(results),
+            'sent': sent,
+            'failed': len(results) - sent,
+            'results': results
+        }), 200
+        
     except Exception as e:
-        print(f"ERROR in send_rcs: {str(e)}")
-        traceback.print_exc()
+        logger.exception("ERROR in send_rcs_bulk: %s", e)
         return jsonify({
             'success': False,
             'error': str(e)
@@ -411,54 +1372,117 @@ def get_messages():
     """Get message history"""
     try:
         limit = request.args.get('limit', 50, type=int)
-        conn = sqlite3.connect(DATABASE)
-        conn.row_factory = sqlite3.Row
-        c = conn.cursor()
-        c.execute('''
-            SELECT * FROM messages 
-            ORDER BY timestamp DESC 
-            LIMIT ?
-        ''', (limit,))
+        recipient = request.args.get('recipient')
+        
+        # ?fields=id,recipient,status narrows the projection; default is every column
+        requested = [f.strip() for f in request.args.get('fields', '').split(',') if f.strip()]
+        
+        unknown = [f for f in requested if f not in MESSAGE_COLUMNS]
+        if unknown:
+            return jsonify({'error': f'Unknown fields: {", ".join(unknown)}'}), 400
+        
+        cache_key = (limit, recipient, tuple(requested))
+        cached, cache_token = get_cached_messages(cache_key)
+        if cached is not None:
+            return app.response_class(cached, status=200, mimetype='application/json')
+        
+        if requested:
+            selected = list(dict.fromkeys(requested))
+            # variables may need rebuilding from the typed columns
+            hidden = []
+            if 'variables' in selected:
+                hidden = [col for col in TYPED_VARIABLE_COLUMNS if col not in selected]
+            projection = ', '.join(selected + hidden)
+        elif MESSAGES_JSON_IN_SQL:
+            with get_read_conn() as conn:
+                if recipient:
+                    row = conn.execute(SELECT_RECIPIENT_MESSAGES_JSON_SQL, (recipient, limit)).fetchone()
+                else:
+                    row = conn.execute(SELECT_MESSAGES_JSON_SQL, (limit,)).fetchone()
+            cache_messages(cache_key, row[0], cache_token)
+            return app.response_class(row[0], status=200, mimetype='application/json')
+        else:
+            hidden = []
+            projection = '*'
+        
+        with get_read_conn() as conn:
+            # Plain tuples: column names are resolved once from the description
+            cursor = conn.cursor()
+            cursor.row_factory = None
+            if recipient:
+                # Served by idx_messages_recipient_ts
+                cursor.execute(SELECT_RECIPIENT_MESSAGES_SQL.format(projection), (recipient, limit))
+            else:
+                cursor.execute(SELECT_MESSAGES_SQL.format(projection), (limit,))
+            columns = [d[0] for d in cursor.description]
+            rows = cursor.fetchall()
         
+        # JSON columns are only parsed when they were selected
+        json_columns = MESSAGE_JSON_COLUMNS.intersection(columns)
+        rebuild_variables = 'variables' in columns
         messages = []
-        for row in c.fetchall():
-            msg = dict(row)
-            # Parse JSON fields
-            for field in ['quick_replies', 'variables']:
-                if msg.get(field):
-                    try:
-                        msg[field] = json.loads(msg[field])
-                    except:
-                        pass
+        for row in rows:
+            msg = {
+                col: _load_json_column(value) if value and col in json_columns else value
+                for col, value in zip(columns, row)
+            }
+            # Newer rows keep template variables in typed columns; expose them the same way
+            if rebuild_variables and msg['variables'] is None and any(msg[col] is not None for col in TYPED_VARIABLE_COLUMNS):
+                msg['variables'] = {'name': msg['customer_name'], 'date': msg['appt_date'], 'time': msg['appt_time']}
+            for col in hidden:
+                del msg[col]
             messages.append(msg)
         
-        conn.close()
-        return jsonify(messages), 200
+        body = orjson.dumps(messages)
+        cache_messages(cache_key, body, cache_token)
+        return app.response_class(body, status=200, mimetype='application/json')
         
     except Exception as e:
-        print(f"Error in get_messages: {str(e)}")
+        logger.error("Error in get_messages: %s", e)
         return jsonify({'error': str(e)}), 500
 
+def _log_webhook_reply(recipient_phone, future):
+    """Report the outcome of a background webhook reply"""
+    error = future.exception()
+    if error:
+        logger.error("❌ Reply to %s failed: %s", recipient_phone, error)
+    else:
+        logger.info("✅ AI Response sent successfully: %s", future.result().sid)
+
+# (from_number, text) -> when it was last answered, oldest first
+_recent_inbound = OrderedDict()
+_recent_inbound_lock = threading.Lock()
+
+def _is_duplicate_inbound(from_number, text):
+    """Whether this number sent the same text within WEBHOOK_DEDUPE_WINDOW; records it otherwise"""
+    key = (from_number, text)
+    now = time.monotonic()
+    with _recent_inbound_lock:
+        seen_at = _recent_inbound.get(key)
+        if seen_at is not None and now - seen_at < WEBHOOK_DEDUPE_WINDOW:
+            return True
+        _recent_inbound[key] = now
+        _recent_inbound.move_to_end(key)
+        while len(_recent_inbound) > WEBHOOK_DEDUPE_SIZE:
+            _recent_inbound.popitem(last=False)
+    return False
+
 @app.route('/rcs-webhook', methods=['POST'])
 def handle_rcs_webhook():
     """Handle incoming messages with AI intelligence"""
     try:
-        # LOG ABSOLUTELY EVERYTHING
-        print("\n" + "🔴" * 25)
-        print("WEBHOOK HIT!")
-        print("🔴" * 25)
-        print(f"Timestamp: {datetime.now()}")
-        print(f"Method: {request.method}")
-        print("\n--- ALL HEADERS ---")
-        for header, value in request.headers:
-            print(f"{header}: {value}")
-        print("\n--- ALL FORM DATA ---")
-        for key, value in request.form.items():
-            print(f"{key}: {value}")
-        print("\n--- ALL ARGS ---")
-        for key, value in request.args.items():
-            print(f"{key}: {value}")
-        print("🔴" * 25 + "\n")
+        # LOG ABSOLUTELY EVERYTHING (skipped entirely unless LOG_LEVEL=DEBUG)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("🔴 WEBHOOK HIT! %s %s", datetime.now(), request.method)
+            logger.debug("--- ALL HEADERS ---")
+            for header, value in request.headers:
+                logger.debug("%s: %s", header, value)
+            logger.debug("--- ALL FORM DATA ---")
+            for key, value in request.form.items():
+                logger.debug("%s: %s", key, value)
+            logger.debug("--- ALL ARGS ---")
+            for key, value in request.args.items():
+                logger.debug("%s: %s", key, value)
         
         # Get webhook data
         message_sid = request.form.get('MessageSid')
@@ -473,11 +1497,17 @@ def handle_rcs_webhook():
         if from_number.startswith('messenger:'):
             from_number = from_number.replace('messenger:', '')
             
-        print(f"Original From: {request.form.get('From')}")
-        print(f"Cleaned From: {from_number}")
-        print(f"To: {to_number}")
-        print(f"Body: {body}")
-        print(f"Button: {button_payload}")
+        logger.debug("Original From: %s", request.form.get('From'))
+        logger.debug("Cleaned From: %s", from_number)
+        logger.debug("To: %s", to_number)
+        logger.debug("Body: %s", body)
+        logger.debug("Button: %s", button_payload)
+        
+        # Retries and spam bursts of the same text get one reply, one log row and one send
+        inbound_text = button_payload or body
+        if inbound_text and _is_duplicate_inbound(from_number, inbound_text):
+            logger.info("Skipping duplicate message from %s", from_number)
+            return '', 200
         
         response_text = ""
         
@@ -485,97 +1515,103 @@ def handle_rcs_webhook():
         if button_payload:
             button_lower = button_payload.lower()
             if 'website' in button_lower:
-                response_text = "🌐 Visit us at ringlypro.com or let me know what specific information you're looking for!"
-            elif button_lower in ['confirm', 'confirmed']:
-                response_text = "✅ Perfect! Your appointment is confirmed. We'll send you a reminder 24 hours before."
-            elif button_lower in ['reschedule']:
-                response_text = "📅 No problem! When would work better for you? Reply with your preferred date and time."
+                response_text = WEBSITE_REPLY
+            elif not HAS_LETTER.search(button_lower):
+                # Empty, numeric or emoji-only payloads: skip the responder, the answer is fixed
+                response_text = DEFAULT_REPLY
             else:
-                response_text = ai_responder.get_response(button_payload, from_number)
+                response_text = BUTTON_REPLIES.get(button_lower) or ai_responder.get_response(button_payload, from_number)
         
         # Handle text messages with AI
         elif body:
-            # Handle numbered responses
-            if body.strip() == '1':
-                response_text = "✅ Perfect! Your appointment is confirmed. We'll see you soon!"
-            elif body.strip() == '2':
-                response_text = "📅 To reschedule, please call us at 1-888-610-3810 or reply with your preferred date and time."
-            elif body.strip() == '3':
-                response_text = "📞 Please call us at 1-888-610-3810. We're available Mon-Fri 9AM-5PM EST."
-            else:
-                # Get AI response
-                response_text = ai_responder.get_response(body, from_number)
+            # Numbered replies first, then typed-out button keywords ("Confirm", "Reschedule")
+            response_text = NUMBERED_REPLIES.get(body) or BUTTON_REPLIES.get(body.lower())
+            if response_text is None:
+                # Get AI response along with the intent it was based on
+                intent, response_text = ai_responder.respond(body, from_number)
                 
                 # Log the conversation
-                intent = ai_responder.detect_intent(body)
                 log_conversation(from_number, body, response_text, str(intent))
+        elif 'Body' not in request.form:
+            # Status callbacks and other non-message posts carry no Body; don't spend a send on them
+            logger.debug("Ignoring webhook without Body or ButtonPayload (MessageStatus=%s)", request.form.get('MessageStatus'))
+            return '', 200
         else:
-            response_text = "Thanks for reaching out to RinglyPro! How can I help you today?"
+            response_text = GREETING_REPLY
         
         # Send the intelligent response
         if response_text and from_number:
-            print(f"Attempting to send response to {from_number}")
-            print(f"Response: {response_text[:100]}...")
+            logger.debug("Attempting to send response to %s", from_number)
+            logger.debug("Response: %.100s...", response_text)
             
-            # Send as regular message
-            twilio_client.messages.create(
+            # Send as regular message off the request thread so Twilio gets its 200 right away
+            future = reply_executor.submit(
+                twilio_client.messages.create,
                 messaging_service_sid=TWILIO_MESSAGING_SERVICE_SID,
                 to=from_number,
                 body=response_text
             )
-            
-            print(f"✅ AI Response sent successfully!")
+            future.add_done_callback(partial(_log_webhook_reply, from_number))
         else:
-            print("⚠️ No response text or from_number")
+            logger.warning("⚠️ No response text or from_number")
         
         return '', 200
         
     except Exception as e:
-        print(f"❌ Webhook error: {str(e)}")
-        traceback.print_exc()
+        logger.exception("❌ Webhook error: %s", e)
         return '', 200
         
     except Exception as e:
-        print(f"Webhook error: {str(e)}")
-        traceback.print_exc()
+        logger.exception("Webhook error: %s", e)
         return '', 200
 
+@app.route('/twilio-status', methods=['POST'])
+def twilio_status():
+    """Record delivery status callbacks from Twilio"""
+    message_sid = request.form.get('MessageSid')
+    message_status = request.form.get('MessageStatus')
+    if not message_sid or not message_status:
+        return '', 400
+    
+    # The sender reported here is authoritative for the channel used
+    from_field = request.form.get('From', '')
+    message_type = 'RCS' if is_rcs_sender(from_field) else None
+    
+    logger.debug("Status callback %s: %s (%s)", message_sid, message_status, from_field)
+    enqueue_message_rows(MessageStatusUpdate(message_status, message_type, message_sid))
+    return '', 204
+
 @app.route('/test-template', methods=['POST'])
 def test_template():
     """Test endpoint for the RCS template"""
     try:
-        data = request.json
+        data = request.get_json(silent=True) or {}
         phone = data.get('phone', '+16566001400')
         
-        if not phone.startswith('+'):
-            phone = '+' + phone
+        if not isinstance(phone, str) or not E164_PATTERN.match(phone):
+            return jsonify({'success': False, 'error': 'Invalid phone number'}), 400
         
-        print(f"=== TESTING TEMPLATE ===")
-        print(f"Template SID: {RCS_CARD_TEMPLATE_SID}")
-        print(f"Phone: {phone}")
+        phone = normalize_phone(phone)
+        
+        logger.debug("=== TESTING TEMPLATE ===")
+        logger.debug("Template SID: %s", RCS_CARD_TEMPLATE_SID)
+        logger.debug("Phone: %s", phone)
         
         # Simple test message
         test_message = f"Test at {datetime.now().strftime('%H:%M:%S')}: This is a test of the RCS card template. If you see this, the template is working!"
         
-        message = twilio_client.messages.create(
-            messaging_service_sid=TWILIO_MESSAGING_SERVICE_SID,
-            to=phone,
-            content_sid=RCS_CARD_TEMPLATE_SID,
-            content_variables=json.dumps({
-                "1": test_message
-            })
-        )
+        # Test sends are not logged, so no status callbacks for them
+        message = send_rcs_template(phone, test_message, status_callback=False)
         
-        # Check details
-        sent_msg = twilio_client.messages(message.sid).fetch()
-        from_field = str(sent_msg.from_)
-        is_rcs = 'rcs:' in from_field.lower()
+        # Details come from the create response; /twilio-status reports the final state
+        from_field = str(message.from_)
+        is_rcs = is_rcs_sender(from_field)
         
         return jsonify({
             'success': True,
             'message_sid': message.sid,
             'from': from_field,
-            'status': sent_msg.status,
+            'status': message.status,
             'is_rcs': is_rcs,
             'message_type': 'RCS' if is_rcs else 'SMS',
             'template_sid': RCS_CARD_TEMPLATE_SID
@@ -599,11 +1635,13 @@ def test_template():
 def test_sms():
     """Test simple SMS without template"""
     try:
-        data = request.json
+        data = request.get_json(silent=True) or {}
         phone = data.get('phone', '+16566001400')
         
-        if not phone.startswith('+'):
-            phone = '+' + phone
+        if not isinstance(phone, str) or not E164_PATTERN.match(phone):
+            return jsonify({'success': False, 'error': 'Invalid phone number'}), 400
+        
+        phone = normalize_phone(phone)
         
         timestamp = datetime.now().strftime('%H:%M:%S')
         
@@ -614,14 +1652,11 @@ def test_sms():
             body=f"Simple SMS test from RinglyPro at {timestamp}. No template used."
         )
         
-        # Get status
-        sent_msg = twilio_client.messages(message.sid).fetch()
-        
         return jsonify({
             'success': True,
             'message_sid': message.sid,
-            'from': str(sent_msg.from_),
-            'status': sent_msg.status,
+            'from': str(message.from_),
+            'status': message.status,
             'message_type': 'SMS'
         }), 200
         
@@ -631,63 +1666,64 @@ def test_sms():
             'error': str(e)
         }), 500
 
+# (expires_at, payload): dashboards poll this, so the aggregates are shared for a few seconds
+_analytics_cache = (0.0, None)
+
 @app.route('/analytics', methods=['GET'])
 def get_analytics():
     """Get AI conversation analytics"""
+    global _analytics_cache
+    expires_at, payload = _analytics_cache
+    if payload is not None and time.monotonic() < expires_at:
+        return jsonify(payload), 200
+    
     try:
-        conn = sqlite3.connect(DATABASE)
-        c = conn.cursor()
-        
-        # Get intent distribution
-        c.execute('''
-            SELECT intent, COUNT(*) as count 
-            FROM conversations 
-            WHERE intent IS NOT NULL 
-            GROUP BY intent
-        ''')
-        intent_rows = c.fetchall()
-        intent_stats = dict(intent_rows) if intent_rows else {}
-        
-        # Get total conversations
-        c.execute('SELECT COUNT(*) FROM conversations')
-        total_result = c.fetchone()
-        total_conversations = total_result[0] if total_result else 0
-        
-        # Get unique users
-        c.execute('SELECT COUNT(DISTINCT phone_number) FROM conversations')
-        unique_result = c.fetchone()
-        unique_users = unique_result[0] if unique_result else 0
-        
-        # Get total messages sent
-        c.execute('SELECT COUNT(*) FROM messages')
-        messages_result = c.fetchone()
-        total_messages = messages_result[0] if messages_result else 0
-        
-        conn.close()
+        with get_read_conn() as conn:
+            c = conn.cursor()
+            c.row_factory = None
+            
+            # Get intent distribution
+            c.execute('''
+                SELECT intent, COUNT(*) as count 
+                FROM conversations 
+                WHERE intent IS NOT NULL 
+                GROUP BY intent
+            ''')
+            intent_rows = c.fetchall()
+            intent_stats = dict(intent_rows) if intent_rows else {}
+            
+            # Get total conversations, unique users and total messages sent in one statement
+            c.execute('''
+                SELECT
+                    (SELECT COUNT(*) FROM conversations),
+                    (SELECT COUNT(DISTINCT phone_number) FROM conversations),
+                    (SELECT COUNT(*) FROM messages)
+            ''')
+            total_conversations, unique_users, total_messages = c.fetchone()
         
-        return jsonify({
+        payload = {
             'total_conversations': total_conversations,
             'unique_users': unique_users,
             'total_messages_sent': total_messages,
             'intent_distribution': intent_stats,
             'ai_response_rate': '100%',
             'average_response_time': '<1 second'
-        }), 200
+        }
+        _analytics_cache = (time.monotonic() + ANALYTICS_CACHE_TTL, payload)
+        return jsonify(payload), 200
         
     except Exception as e:
-        print(f"Analytics error: {str(e)}")
+        logger.error("Analytics error: %s", e)
         return jsonify({'error': str(e)}), 500
 
-@app.route('/conversations', methods=['GET'])
-def get_conversations():
-    """Get conversation history with AI insights"""
-    try:
-        limit = request.args.get('limit', 50, type=int)
-        phone = request.args.get('phone', None)
-        
-        conn = sqlite3.connect(DATABASE)
-        conn.row_factory = sqlite3.Row
+# Rows fetched per chunk while streaming /conversations
+CONVERSATIONS_FETCH_SIZE = 100
+
+def _stream_conversations(phone, limit):
+    """Yield /conversations as JSON array chunks, holding one read connection throughout"""
+    with get_read_conn() as conn:
         c = conn.cursor()
+        c.row_factory = None
         
         if phone:
             c.execute('''
@@ -703,21 +1739,77 @@ def get_conversations():
                 LIMIT ?
             ''', (limit,))
         
-        conversations = [dict(row) for row in c.fetchall()]
-        conn.close()
+        # Plain tuples zipped with column names captured once, not a sqlite3.Row per row
+        columns = tuple(d[0] for d in c.description)
+        
+        # The query has run; the caller primes this generator up to here
+        yield b'['
+        separator = b''
+        while True:
+            rows = c.fetchmany(CONVERSATIONS_FETCH_SIZE)
+            if not rows:
+                break
+            yield separator + b','.join(orjson.dumps(dict(zip(columns, row))) for row in rows)
+            separator = b','
+        yield b']'
+
+@app.route('/conversations', methods=['GET'])
+def get_conversations():
+    """Get conversation history with AI insights"""
+    try:
+        limit = request.args.get('limit', 50, type=int)
+        phone = request.args.get('phone', None)
+        
+        # Run the query now so database errors still come back as a 500
+        chunks = _stream_conversations(phone, limit)
+        opening = next(chunks)
+        
+        def generate():
+            yield opening
+            yield from chunks
         
-        return jsonify(conversations), 200
+        return app.response_class(generate(), status=200, mimetype='application/json')
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+# Statuses that will not change again (short of a late RCS read receipt, bounded by the TTL)
+FINAL_MESSAGE_STATUSES = frozenset(('delivered', 'read', 'failed', 'undelivered', 'canceled'))
+
+# sid -> (expires_at, response bytes), oldest first
+_status_cache = OrderedDict()
+_status_cache_lock = threading.Lock()
+
+def _get_cached_status(message_sid):
+    """Return a cached status response body, or None"""
+    with _status_cache_lock:
+        entry = _status_cache.get(message_sid)
+        if entry is None:
+            return None
+        if entry[0] < time.monotonic():
+            del _status_cache[message_sid]
+            return None
+        return entry[1]
+
+def _cache_status(message_sid, body):
+    """Remember a final status response for MESSAGE_STATUS_CACHE_TTL seconds"""
+    with _status_cache_lock:
+        _status_cache[message_sid] = (time.monotonic() + MESSAGE_STATUS_CACHE_TTL, body)
+        _status_cache.move_to_end(message_sid)
+        while len(_status_cache) > MESSAGE_STATUS_CACHE_SIZE:
+            _status_cache.popitem(last=False)
+
 @app.route('/check-message-status/<message_sid>', methods=['GET'])
 def check_message_status(message_sid):
     """Check the actual status of a sent message"""
+    cached = _get_cached_status(message_sid)
+    if cached is not None:
+        return app.response_class(cached, status=200, mimetype='application/json')
+    
     try:
         message = twilio_client.messages(message_sid).fetch()
         
-        return jsonify({
+        body = orjson.dumps({
             'sid': message.sid,
             'from': str(message.from_),
             'to': str(message.to),
@@ -731,24 +1823,27 @@ def check_message_status(message_sid):
             'messaging_service_sid': message.messaging_service_sid,
             'num_segments': message.num_segments,
             'body': message.body[:100] + '...' if message.body else None
-        }), 200
+        })
+        if message.status in FINAL_MESSAGE_STATUSES:
+            _cache_status(message_sid, body)
+        return app.response_class(body, status=200, mimetype='application/json')
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 10000))
-    print("=" * 50)
-    print("🤖 RINGLYPRO AI-POWERED RCS ASSISTANT")
-    print("=" * 50)
-    print(f"Port: {port}")
-    print(f"Account SID: {'✓ Set' if TWILIO_ACCOUNT_SID else '✗ Not Set'}")
-    print(f"Auth Token: {'✓ Set' if TWILIO_AUTH_TOKEN else '✗ Not Set'}")
-    print(f"Messaging Service: {TWILIO_MESSAGING_SERVICE_SID if TWILIO_MESSAGING_SERVICE_SID else '✗ Not Set'}")
-    print(f"RCS Template: {RCS_CARD_TEMPLATE_SID if RCS_CARD_TEMPLATE_SID else '✗ Not Set'}")
-    print(f"Phone Number: {TWILIO_PHONE_NUMBER}")
-    print(f"AI Responder: ✓ Active")
-    print(f"Intent Detection: ✓ Ready")
-    print(f"Conversation Tracking: ✓ Enabled")
-    print("=" * 50)
+    logger.info("=" * 50)
+    logger.info("🤖 RINGLYPRO AI-POWERED RCS ASSISTANT")
+    logger.info("=" * 50)
+    logger.info("Port: %s", port)
+    logger.info("Account SID: %s", '✓ Set' if TWILIO_ACCOUNT_SID else '✗ Not Set')
+    logger.info("Auth Token: %s", '✓ Set' if TWILIO_AUTH_TOKEN else '✗ Not Set')
+    logger.info("Messaging Service: %s", TWILIO_MESSAGING_SERVICE_SID or '✗ Not Set')
+    logger.info("RCS Template: %s", RCS_CARD_TEMPLATE_SID or '✗ Not Set')
+    logger.info("Phone Number: %s", TWILIO_PHONE_NUMBER)
+    logger.info("AI Responder: ✓ Active")
+    logger.info("Intent Detection: ✓ Ready")
+    logger.info("Conversation Tracking: ✓ Enabled")
+    logger.info("=" * 50)
     app.run(host='0.0.0.0', port=port, debug=False)
@@ -0,0 +1,107 @@
+"""
+RinglyPro RCS Assistant configuration
+Environment-driven settings and shared constants used by app.py
+"""
+
+import os
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Twilio Configuration from Environment Variables
+TWILIO_ACCOUNT_SID = os.getenv('TWILIO_ACCOUNT_SID')
+TWILIO_AUTH_TOKEN = os.getenv('TWILIO_AUTH_TOKEN')
+TWILIO_MESSAGING_SERVICE_SID = os.getenv('TWILIO_MESSAGING_SERVICE_SID')
+TWILIO_PHONE_NUMBER = os.getenv('TWILIO_PHONE_NUMBER', '+18886103810')
+
+# RCS Template Configuration from Environment Variable
+RCS_CARD_TEMPLATE_SID = os.getenv('RCS_CARD_TEMPLATE_SID', 'HXf872225ca0766f4b7f0f7ab024685ae7')
+
+# Public URL of /twilio-status; when set, sends ask Twilio to report delivery status there
+TWILIO_STATUS_CALLBACK_URL = os.getenv('TWILIO_STATUS_CALLBACK_URL')
+
+# Logging verbosity (DEBUG traces every request; WARNING is quietest for production)
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+
+# Keep-alive connections held open to api.twilio.com; sized to match the
+# concurrent requests one gunicorn worker can have in flight
+TWILIO_POOL_SIZE = int(os.getenv('TWILIO_POOL_SIZE', os.getenv('WORKER_CONNECTIONS', 200)))
+
+# Default appointment reminder sent through the RCS card template
+APPOINTMENT_MESSAGE_TEMPLATE = (
+    "Hi {name}! Your appointment is scheduled for {date} at {time}. "
+    "Please confirm your attendance. Reply 1 to Confirm, 2 to Reschedule, or 3 to Call us."
+)
+
+# ==========================================
+# DATABASE
+# ==========================================
+DATABASE = 'messages.db'
+
+# WAL lets readers proceed while a write is in flight; NORMAL sync is safe under WAL
+SQLITE_PRAGMAS = (
+    'PRAGMA journal_mode=WAL',
+    'PRAGMA synchronous=NORMAL',
+    'PRAGMA temp_store=MEMORY',
+    'PRAGMA cache_size=-64000',
+    'PRAGMA mmap_size=268435456',
+    'PRAGMA busy_timeout=5000',
+)
+
+# Pooled connections stay open for the life of the worker process
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 5))
+DB_READ_POOL_SIZE = int(os.getenv('DB_READ_POOL_SIZE', 8))
+DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', 10))
+
+# Per-connection prepared statement cache; /messages builds a few SQL variants
+DB_CACHED_STATEMENTS = 256
+
+# Background log writer batching
+LOG_BATCH_SIZE = 100
+LOG_BATCH_WAIT = 0.05  # seconds to wait for more rows before committing
+LOG_QUEUE_MAXSIZE = 10000  # beyond this, rows are written inline by the caller
+
+# Status callbacks that arrive before their message row is written wait this long for it
+STATUS_UPDATE_PARK_TTL = 600  # seconds
+STATUS_UPDATE_PARK_SIZE = 10000
+STATUS_UPDATE_RETRY_INTERVAL = 1.0  # seconds between retries when the writer is otherwise idle
+
+# /messages responses are reused until the next write or this many seconds
+MESSAGES_CACHE_TTL = 2.0
+MESSAGES_CACHE_SIZE = 32
+
+# /analytics aggregates are recomputed at most this often
+ANALYTICS_CACHE_TTL = 10  # seconds
+
+# Optional Redis shared by all workers as a second /messages cache level
+REDIS_URL = os.getenv('REDIS_URL')
+# Short socket timeouts so an unreachable Redis falls back to SQLite instead of stalling requests
+REDIS_SOCKET_TIMEOUT = float(os.getenv('REDIS_SOCKET_TIMEOUT', '0.2'))  # seconds
+
+# ==========================================
+# BULK SENDS
+# ==========================================
+BULK_MAX_RECIPIENTS = int(os.getenv('BULK_MAX_RECIPIENTS', 500))
+BULK_SEND_RATE = float(os.getenv('BULK_SEND_RATE', 10))  # messages per second
+BULK_MAX_WORKERS = int(os.getenv('BULK_MAX_WORKERS', 20))
+
+# Bounds on a request's throttle_per_sec: the request waits while its items are paced out
+BULK_MIN_THROTTLE = 0.1  # messages per second
+BULK_MAX_THROTTLED_SECONDS = int(os.getenv('BULK_MAX_THROTTLED_SECONDS', 600))
+
+# Webhook auto-replies get their own workers so bulk sends never queue them
+REPLY_MAX_WORKERS = int(os.getenv('REPLY_MAX_WORKERS', 4))
+
+# Live async send jobs tracked in memory for /task-status lookups (per worker process)
+SEND_JOB_HISTORY = int(os.getenv('SEND_JOB_HISTORY', 1000))
+# Job states in the shared send_jobs table, readable by every worker, are kept this long
+SEND_JOB_RETENTION_HOURS = int(os.getenv('SEND_JOB_RETENTION_HOURS', 24))
+
+# /check-message-status answers for finished messages are reused for this long
+MESSAGE_STATUS_CACHE_TTL = 300  # seconds
+MESSAGE_STATUS_CACHE_SIZE = 1024
+
+# Identical inbound webhook messages from one number within this window get no second reply
+WEBHOOK_DEDUPE_WINDOW = float(os.getenv('WEBHOOK_DEDUPE_WINDOW', 5))  # seconds
+WEBHOOK_DEDUPE_SIZE = 10000
@@ -0,0 +1,16 @@
+"""
+Gunicorn configuration for RinglyPro RCS Assistant
+Picked up automatically by `gunicorn app:app`
+"""
+
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 10000)}"
+
+# gevent workers patch sockets so Twilio API calls yield instead of blocking
+worker_class = 'gevent'
+workers = int(os.environ.get('WEB_CONCURRENCY', 4))
+worker_connections = int(os.environ.get('WORKER_CONNECTIONS', 200))
+
+# Hold idle client connections open so pollers and iframes reuse them
+keepalive = int(os.environ.get('KEEPALIVE', 75))
@@ -3,7 +3,7 @@ RCS Payload Utility Functions
 Handles RCS message formatting and SMS fallback
 """
 
-import json
+import re
 from typing import List, Dict, Optional
 
 
@@ -168,6 +168,10 @@ def create_sms_fallback(
     return sms_message
 
 
+# Everything except digits and '+', stripped in one C-level pass
+NON_PHONE_CHARS = re.compile(r'[^\d+]')
+
+
 def validate_phone_number(phone: str) -> str:
     """
     Validate and format phone number for Twilio
@@ -182,7 +186,7 @@ def validate_phone_number(phone: str) -> str:
         ValueError: If phone number is invalid
     """
     # Remove all non-numeric characters except +
-    cleaned = ''.join(c for c in phone if c.isdigit() or c == '+')
+    cleaned = NON_PHONE_CHARS.sub('', phone)
     
     # Ensure it starts with +
     if not cleaned.startswith('+'):
@@ -240,15 +244,16 @@ def get_template(template_name: str, **kwargs) -> Dict:
     if template_name not in TEMPLATES:
         raise ValueError(f"Template '{template_name}' not found")
     
-    template = TEMPLATES[template_name].copy()
+    template = TEMPLATES[template_name]
     
-    # Replace variables in body
-    if "body" in template and kwargs:
-        template["body"] = template["body"].format(**kwargs)
+    # Replace variables in body (the shared template itself is never modified)
+    body = template.get("body", "")
+    if body and kwargs:
+        body = body.format(**kwargs)
     
     # Create RCS payload from template
     return create_rcs_payload(
-        message_body=template.get("body", ""),
+        message_body=body,
         image_url=template.get("image_url"),
         quick_replies=template.get("quick_replies"),
         rich_card=template.get("rich_card")